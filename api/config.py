@@ -3,6 +3,12 @@ from typing import Optional
 import os
 from functools import lru_cache
 
+# Resolve Google Colab userdata once; outside Colab the import fails and this stays None
+try:
+    from google.colab import userdata as _colab_userdata
+except Exception:
+    _colab_userdata = None
+
 class Settings(BaseSettings):
     """Application settings"""
     
@@ -11,6 +17,7 @@ class Settings(BaseSettings):
     debug: bool = False
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: Optional[int] = None  # defaults to one per CPU (single worker in debug)
     
     # Database Settings
     db_host: str
@@ -18,6 +25,7 @@ class Settings(BaseSettings):
     db_password: str
     db_name: str
     db_port: int = 3306
+    db_pool_size: int = 16
     
     # Recommendation Engine Settings
     default_k_neighbors: int = 10
@@ -28,6 +36,8 @@ class Settings(BaseSettings):
     # Cache Settings
     cache_ttl: int = 3600  # 1 hour
     enable_caching: bool = True
+    lookup_cache_size: int = 10_000
+    lookup_cache_ttl: int = 600  # 10 minutes
     
     # Logging Settings
     log_level: str = "INFO"
@@ -39,39 +49,52 @@ class Settings(BaseSettings):
     
     # Model Settings
     svd_components: int = 20
-    svd_iterations: int = 10
+    svd_iterations: int = 5  # randomized SVD power iterations
     bayesian_confidence_weight: float = 10.0
+    model_cache_dir: Optional[str] = "model_cache"  # unset to disable model persistence
+    # Each worker process holds its own engine; /admin/refresh rewrites this file
+    # and every worker reloads when it sees the change (unset for a single worker)
+    reload_signal_file: Optional[str] = "model_cache/reload_signal"
+    reload_poll_interval: int = 15  # seconds
     
     class Config:
         env_file = ".env"
         case_sensitive = False
-        
-        # For Google Colab userdata compatibility
-        @classmethod
-        def customise_sources(cls, init_settings, env_settings, file_secret_settings):
-            return (
-                init_settings,
-                colab_userdata_settings,
-                env_settings,
-                file_secret_settings,
-            )
+        # Allow the model_* settings (pydantic reserves that prefix by default)
+        protected_namespaces = ('settings_',)
+    
+    # For Google Colab userdata compatibility (pydantic-settings v2 hook)
+    @classmethod
+    def settings_customise_sources(
+        cls, settings_cls, init_settings, env_settings, dotenv_settings, file_secret_settings
+    ):
+        return (
+            init_settings,
+            colab_userdata_settings,
+            env_settings,
+            dotenv_settings,
+            file_secret_settings,
+        )
 
-def colab_userdata_settings(settings: BaseSettings) -> dict:
+def colab_userdata_settings() -> dict:
     """Load settings from Google Colab userdata if available"""
-    try:
-        from google.colab import userdata
-        return {
-            'db_host': userdata.get('mwonyaDBHost'),
-            'db_user': userdata.get('mwonyaDBUser'),
-            'db_password': userdata.get('mwonyaDBPassword'),
-            'db_name': userdata.get('mwonyaDB')
-        }
-    except ImportError:
+    if _colab_userdata is None:
         # Not in Colab environment, return empty dict
         return {}
-    except Exception:
-        # userdata not available or keys don't exist
-        return {}
+    secret_names = {
+        'db_host': 'mwonyaDBHost',
+        'db_user': 'mwonyaDBUser',
+        'db_password': 'mwonyaDBPassword',
+        'db_name': 'mwonyaDB'
+    }
+    values = {}
+    for key, secret_name in secret_names.items():
+        try:
+            values[key] = _colab_userdata.get(secret_name)
+        except Exception:
+            # Secret not set or notebook access not granted; fall through to the environment
+            continue
+    return values
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -94,8 +117,9 @@ class TestingSettings(Settings):
     # Use test database settings
     db_name: str = "test_mwonya"
 
+@lru_cache(maxsize=4)
 def get_settings_for_env(env: str = None) -> Settings:
-    """Get settings based on environment"""
+    """Get cached settings based on environment (ENVIRONMENT is read once)"""
     env = env or os.getenv("ENVIRONMENT", "development").lower()
     
     if env == "production":
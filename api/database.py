@@ -1,68 +1,188 @@
-import mysql.connector
+import aiomysql
+import connectorx as cx
+import orjson
 import pandas as pd
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, Hashable, AsyncIterator, Awaitable, Callable
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import logging
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import quote_plus
 
 logger = logging.getLogger(__name__)
 
+class LRUCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+    
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def clear(self):
+        self._data.clear()
+
 class DatabaseManager:
     """Manages database connections and queries for the recommendation system"""
     
+    # Rows per Arrow record batch when streaming bulk result sets
+    BULK_BATCH_SIZE = 50_000
+    # Shortest word InnoDB puts in a FULLTEXT index (innodb_ft_min_token_size)
+    FULLTEXT_MIN_TOKEN = 3
+    # InnoDB's default FULLTEXT stopwords (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD);
+    # they are never indexed, so a required "+the*" term can match nothing
+    FULLTEXT_STOPWORDS = frozenset({
+        'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for',
+        'from', 'how', 'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the',
+        'this', 'to', 'was', 'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www',
+    })
+    # Shared by the DataFrame and streaming play-history readers
+    USER_PLAY_HISTORY_QUERY = """
+    SELECT f.userid, f.songid, f.plays, s.title, g.name as genre
+    FROM frequency f 
+    JOIN songs s ON s.id = f.songid
+    JOIN genres g ON g.id = s.genre
+    WHERE f.userid = %s 
+    AND s.is_available = 1
+    ORDER BY f.plays DESC
+    """
+    
     def __init__(self, settings):
         self.settings = settings
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.pool = None
+        self._pool_lock = asyncio.Lock()
+        # LRU caches for per-request lookups
+        self._song_cache = LRUCache(settings.lookup_cache_size, settings.lookup_cache_ttl)
+        self._search_cache = LRUCache(settings.lookup_cache_size, settings.lookup_cache_ttl)
+        # connectorx connection URL used for the bulk loaders
+        self.conn_url = (
+            f"mysql://{quote_plus(settings.db_user)}:{quote_plus(settings.db_password)}"
+            f"@{settings.db_host}:{settings.db_port}/{settings.db_name}"
+        )
         
-    def get_db_connection(self):
-        """Create a new database connection"""
+    async def connect(self):
+        """Create the connection pool (called once at startup)"""
+        async with self._pool_lock:
+            if self.pool is not None:
+                return
+            try:
+                self.pool = await aiomysql.create_pool(
+                    host=self.settings.db_host,
+                    port=self.settings.db_port,
+                    user=self.settings.db_user,
+                    password=self.settings.db_password,
+                    db=self.settings.db_name,
+                    minsize=min(4, self.settings.db_pool_size),
+                    maxsize=self.settings.db_pool_size,
+                    autocommit=True
+                )
+            except Exception as e:
+                logger.error(f"Database connection failed: {e}")
+                raise
+    
+    async def close(self):
+        """Close all pooled connections"""
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+    
+    async def execute_query(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
+        """Execute a parameterized query asynchronously and return DataFrame"""
+        if self.pool is None:
+            await self.connect()
         try:
-            db = mysql.connector.connect(
-                host=self.settings.db_host,
-                user=self.settings.db_user,
-                password=self.settings.db_password,
-                database=self.settings.db_name,
-                autocommit=True
-            )
-            return db
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(query, params)
+                    
+                    # Fetch column names
+                    columns = [col[0] for col in cursor.description]
+                    # Fetch all rows
+                    rows = await cursor.fetchall()
+            # Convert to DataFrame
+            return pd.DataFrame(list(rows), columns=columns)
+            
         except Exception as e:
-            logger.error(f"Database connection failed: {e}")
+            logger.error(f"Query execution failed: {e}")
             raise
     
-    def _execute_query_sync(self, query: str) -> pd.DataFrame:
-        """Execute query synchronously and return DataFrame"""
-        db = None
-        cursor = None
+    async def fetch_one(self, query: str, params: Optional[tuple] = None) -> Optional[Dict[str, Any]]:
+        """Execute a parameterized query and return its first row as a dict (None if no rows)"""
+        if self.pool is None:
+            await self.connect()
         try:
-            db = self.get_db_connection()
-            cursor = db.cursor()
-            cursor.execute(query)
-            
-            # Fetch column names
-            columns = [col[0] for col in cursor.description]
-            # Fetch all rows
-            rows = cursor.fetchall()
-            # Convert to DataFrame
-            df = pd.DataFrame(rows, columns=columns)
-            return df
-            
+            async with self.pool.acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute(query, params)
+                    return await cursor.fetchone()
         except Exception as e:
             logger.error(f"Query execution failed: {e}")
             raise
-        finally:
-            if cursor:
-                cursor.close()
-            if db:
-                db.close()
-    
-    async def execute_query(self, query: str) -> pd.DataFrame:
-        """Execute query asynchronously and return DataFrame"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            self.executor, 
-            self._execute_query_sync, 
-            query
+    
+    def _read_bulk_query_sync(
+        self,
+        query: str,
+        categorical_strings: bool,
+        dtypes: Optional[Dict[str, str]]
+    ) -> pd.DataFrame:
+        """Stream a result set as Arrow record batches and convert it to pandas"""
+        reader = cx.read_sql(
+            self.conn_url,
+            query,
+            return_type="arrow_stream",
+            batch_size=self.BULK_BATCH_SIZE
+        )
+        table = reader.read_all()
+        # Release each Arrow column as soon as it is converted to keep peak memory down
+        df = table.to_pandas(
+            strings_to_categorical=categorical_strings,
+            split_blocks=True,
+            self_destruct=True
         )
+        if dtypes:
+            df = df.astype(dtypes, copy=False)
+        return df
+    
+    async def read_bulk_query(
+        self,
+        query: str,
+        categorical_strings: bool = False,
+        dtypes: Optional[Dict[str, str]] = None
+    ) -> pd.DataFrame:
+        """Load a large result set straight into columnar buffers via connectorx
+        
+        With `categorical_strings`, string columns stay dictionary-encoded
+        (pandas categoricals) instead of being boxed as Python objects.
+        `dtypes` narrows columns (e.g. int64 -> int32) after loading.
+        """
+        try:
+            return await asyncio.to_thread(self._read_bulk_query_sync, query, categorical_strings, dtypes)
+        except Exception as e:
+            logger.error(f"Bulk query execution failed: {e}")
+            raise
+    
+    def clear_cache(self):
+        """Drop all cached query results"""
+        self._song_cache.clear()
+        self._search_cache.clear()
     
     async def get_song_frequency_data(self) -> pd.DataFrame:
         """Get song frequency data from database"""
@@ -70,91 +190,183 @@ class DatabaseManager:
         SELECT f.userid, f.songid, f.plays 
         FROM frequency f 
         JOIN songs s ON s.id = f.songid  
-        WHERE s.path <> '' AND s.available = 1
+        WHERE s.is_available = 1 AND f.plays IS NOT NULL
         """
-        return await self.execute_query(query)
+        # userid repeats on every row, so keep it dictionary-encoded; ids and
+        # play counts fit in int32, halving the matrix inputs. plays is nullable and a
+        # NULL would turn the column into float NaN, so those rows are skipped
+        return await self.read_bulk_query(
+            query,
+            categorical_strings=True,
+            dtypes={'songid': 'int32', 'plays': 'int32'}
+        )
     
     async def get_song_details_data(self) -> pd.DataFrame:
         """Get song details with genre information"""
         query = """
-        SELECT s.id as songid, s.title, g.name as genre 
+        SELECT s.id as songid, s.title, g.name as genre, s.artist 
         FROM songs s 
         JOIN genres g ON g.id = s.genre 
-        WHERE s.path <> '' AND s.available = 1
+        WHERE s.is_available = 1
         """
-        return await self.execute_query(query)
+        return await self.read_bulk_query(query, dtypes={'songid': 'int32'})
     
     async def get_song_by_id(self, song_id: int) -> Optional[Dict[str, Any]]:
         """Get song details by ID"""
-        query = f"""
+        if self.settings.enable_caching:
+            cached = self._song_cache.get(song_id)
+            if cached is not None:
+                return cached
+        
+        query = """
         SELECT s.id as songid, s.title, g.name as genre, 
                s.artist, s.duration, s.path, s.created_at
         FROM songs s 
         JOIN genres g ON g.id = s.genre 
-        WHERE s.id = {song_id} AND s.path <> '' AND s.available = 1
+        WHERE s.id = %s AND s.is_available = 1
         """
-        df = await self.execute_query(query)
-        if df.empty:
+        song = await self.fetch_one(query, (song_id,))
+        if song is None:
             return None
-        return df.iloc[0].to_dict()
+        if self.settings.enable_caching:
+            self._song_cache.set(song_id, song)
+        return song
     
-    async def search_songs_by_title(self, query: str, limit: int = 10) -> pd.DataFrame:
-        """Search songs by title"""
-        search_query = f"""
-        SELECT s.id as songid, s.title, g.name as genre, s.artist
-        FROM songs s 
-        JOIN genres g ON g.id = s.genre 
-        WHERE s.title LIKE '%{query}%' 
-        AND s.path <> '' AND s.available = 1
-        LIMIT {limit}
+    def _fulltext_prefix_query(self, query: str) -> Optional[str]:
+        """Build a BOOLEAN MODE query requiring every word as a prefix, e.g. "+kara* +moja*"
+        
+        Returns None when some word is too short for the FULLTEXT index or is a
+        stopword it does not index.
         """
-        return await self.execute_query(search_query)
+        words = re.findall(r"\w+", query)
+        if not words or any(
+            len(w) < self.FULLTEXT_MIN_TOKEN or w.lower() in self.FULLTEXT_STOPWORDS for w in words
+        ):
+            return None
+        return " ".join(f"+{w}*" for w in words)
+    
+    async def search_songs_by_title(self, query: str, limit: int = 10) -> pd.DataFrame:
+        """Search songs by title (word-prefix FULLTEXT match, substring LIKE for short words and stopwords)"""
+        # Both matches are case-insensitive under the table collation
+        cache_key = (query.lower(), limit)
+        if self.settings.enable_caching:
+            cached = self._search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        fulltext_query = self._fulltext_prefix_query(query)
+        if fulltext_query is not None:
+            search_query = """
+            SELECT s.id as songid, s.title, g.name as genre, s.artist
+            FROM songs s 
+            JOIN genres g ON g.id = s.genre 
+            WHERE MATCH(s.title) AGAINST (%s IN BOOLEAN MODE) 
+            AND s.is_available = 1
+            LIMIT %s
+            """
+            params = (fulltext_query, limit)
+        else:
+            search_query = """
+            SELECT s.id as songid, s.title, g.name as genre, s.artist
+            FROM songs s 
+            JOIN genres g ON g.id = s.genre 
+            WHERE s.title LIKE %s 
+            AND s.is_available = 1
+            LIMIT %s
+            """
+            params = (f"%{query}%", limit)
+        df = await self.execute_query(search_query, params)
+        if self.settings.enable_caching:
+            self._search_cache.set(cache_key, df)
+        return df
     
     async def get_user_play_history(self, user_id: str) -> pd.DataFrame:
         """Get user's play history"""
-        query = f"""
-        SELECT f.userid, f.songid, f.plays, s.title, g.name as genre
-        FROM frequency f 
-        JOIN songs s ON s.id = f.songid
-        JOIN genres g ON g.id = s.genre
-        WHERE f.userid = '{user_id}' 
-        AND s.path <> '' AND s.available = 1
-        ORDER BY f.plays DESC
+        return await self.execute_query(self.USER_PLAY_HISTORY_QUERY, (user_id,))
+    
+    async def open_user_play_history_stream(
+        self, user_id: str, batch_size: int = 500
+    ) -> Tuple[AsyncIterator[bytes], Callable[[], Awaitable[None]]]:
+        """Run a user's play-history query on a server-side cursor
+        
+        The connection is acquired and the query executed before this returns,
+        so database errors reach the caller before any response is started.
+        Returns an iterator of NDJSON lines and a `release` coroutine that hands
+        the connection back to the pool; it is safe to call more than once.
         """
-        return await self.execute_query(query)
+        if self.pool is None:
+            await self.connect()
+        conn = await self.pool.acquire()
+        cursor = None
+        state = {'exhausted': False, 'released': False}
+        
+        async def release():
+            if state['released']:
+                return
+            state['released'] = True
+            if state['exhausted']:
+                await cursor.close()
+            else:
+                # Unread rows would have to be drained first; dropping the connection is cheaper
+                conn.close()
+            self.pool.release(conn)
+        
+        try:
+            cursor = await conn.cursor(aiomysql.SSCursor)
+            await cursor.execute(self.USER_PLAY_HISTORY_QUERY, (user_id,))
+        except Exception as e:
+            logger.error(f"Play history query failed: {e}")
+            await release()
+            raise
+        
+        async def lines() -> AsyncIterator[bytes]:
+            try:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        state['exhausted'] = True
+                        break
+                    for userid, songid, plays, title, genre in rows:
+                        yield orjson.dumps({
+                            'user_id': userid,
+                            'song_id': songid,
+                            'plays': plays,
+                            'title': title,
+                            'genre': genre
+                        }) + b"\n"
+            except Exception as e:
+                logger.error(f"Play history stream failed: {e}")
+                raise
+            finally:
+                await release()
+        
+        return lines(), release
     
     async def health_check(self) -> str:
         """Check database connection health"""
         try:
             query = "SELECT 1 as health_check"
-            df = await self.execute_query(query)
-            return "healthy" if not df.empty else "unhealthy"
+            row = await self.fetch_one(query)
+            return "healthy" if row else "unhealthy"
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
             return f"unhealthy: {str(e)}"
     
     async def get_system_stats(self) -> Dict[str, Any]:
         """Get system statistics"""
-        stats = {}
-        
-        # Total songs
-        query = "SELECT COUNT(*) as count FROM songs WHERE path <> '' AND available = 1"
-        df = await self.execute_query(query)
-        stats['total_songs'] = int(df.iloc[0]['count'])
-        
-        # Total users
-        query = "SELECT COUNT(DISTINCT userid) as count FROM frequency"
-        df = await self.execute_query(query)
-        stats['total_users'] = int(df.iloc[0]['count'])
-        
-        # Total plays
-        query = "SELECT SUM(plays) as total_plays FROM frequency"
-        df = await self.execute_query(query)
-        stats['total_plays'] = int(df.iloc[0]['total_plays'])
-        
-        # Total genres
-        query = "SELECT COUNT(*) as count FROM genres"
-        df = await self.execute_query(query)
-        stats['total_genres'] = int(df.iloc[0]['count'])
+        # Single round-trip: each statistic is a scalar subquery
+        query = """
+        SELECT
+            (SELECT COUNT(*) FROM songs WHERE is_available = 1) AS total_songs,
+            (SELECT COUNT(DISTINCT userid) FROM frequency) AS total_users,
+            (SELECT COALESCE(SUM(plays), 0) FROM frequency) AS total_plays,
+            (SELECT COUNT(*) FROM genres) AS total_genres
+        """
+        row = await self.fetch_one(query)
         
-        return stats
\ No newline at end of file
+        return {
+            'total_songs': int(row['total_songs']),
+            'total_users': int(row['total_users']),
+            'total_plays': int(row['total_plays']),
+            'total_genres': int(row['total_genres'])
+        }
\ No newline at end of file
@@ -1,16 +1,25 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Path, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import TypeAdapter
 from typing import List, Optional
+import asyncio
+import hashlib
+import os
+import uuid
 import uvicorn
 import logging
 
 from .models import (
+    MetricType,
     SimilarSongsRequest, 
     SimilarSongsResponse, 
     ContentBasedRequest,
     ContentBasedResponse,
     PopularSongsResponse,
     SearchResponse,
+    SongInfo,
     SystemStats
 )
 from .database import DatabaseManager
@@ -24,7 +33,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="MW Music Recommender API",
     description="Music recommendation system API with collaborative and content-based filtering",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -37,16 +47,123 @@ app.add_middleware(
 
 settings = get_settings()
 db_manager = DatabaseManager(settings)
-recommendation_engine = RecommendationEngine(db_manager)
+
+def _create_engine() -> RecommendationEngine:
+    """New, uninitialized engine configured from settings"""
+    return RecommendationEngine(
+        db_manager,
+        model_cache_dir=settings.model_cache_dir,
+        svd_components=settings.svd_components,
+        svd_iterations=settings.svd_iterations
+    )
+
+# Reloads build a new engine and rebind this name once it is complete
+recommendation_engine = _create_engine()
+_reload_lock = asyncio.Lock()
+
+# Song lists come from the engine already validated, so the list endpoints dump them
+# in one pass and return the payload directly instead of revalidating via response_model
+SONG_LIST_ADAPTER = TypeAdapter(List[SongInfo])
+
+def dump_songs(songs: List[SongInfo]) -> list:
+    """Serialize a list of songs to JSON-compatible dicts"""
+    return SONG_LIST_ADAPTER.dump_python(songs, mode="json")
+
+# Popular songs only change when the engine reloads, so they are precomputed per algorithm
+POPULAR_ALGORITHMS = ("bayesian", "frequency")
+app.state.popular_cache = {}
+
+async def _build_popular_cache(engine: RecommendationEngine) -> dict:
+    """Precompute the popular-song lists served by /recommendations/popular"""
+    cache = {}
+    for algorithm in POPULAR_ALGORITHMS:
+        songs = await engine.get_popular_songs(
+            limit=settings.max_recommendations,
+            algorithm=algorithm
+        )
+        cache[algorithm] = dump_songs(songs)
+    return cache
+
+async def refresh_popular_cache():
+    """Recompute the popular-song lists from the current engine"""
+    app.state.popular_cache = await _build_popular_cache(recommendation_engine)
+
+def _read_reload_signal() -> Optional[str]:
+    """Current token in the shared reload signal file, if any"""
+    if not settings.reload_signal_file:
+        return None
+    try:
+        with open(settings.reload_signal_file) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def _write_reload_signal() -> str:
+    """Store a new token in the reload signal file so the other workers reload"""
+    token = uuid.uuid4().hex
+    directory = os.path.dirname(settings.reload_signal_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{settings.reload_signal_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(token)
+    os.replace(tmp_path, settings.reload_signal_file)
+    return token
+
+async def reload_engine():
+    """Build a fresh engine and popular lists, swapping them in only once both are ready
+    
+    The current engine keeps serving while the new one loads; if the reload
+    fails it stays in place untouched.
+    """
+    global recommendation_engine
+    async with _reload_lock:
+        engine = _create_engine()
+        await engine.initialize()
+        popular_cache = await _build_popular_cache(engine)
+        
+        recommendation_engine = engine
+        app.state.popular_cache = popular_cache
+        db_manager.clear_cache()
+
+async def _reload_watcher():
+    """Reload this worker whenever another worker handled /admin/refresh"""
+    while True:
+        await asyncio.sleep(settings.reload_poll_interval)
+        signal = _read_reload_signal()
+        if signal == app.state.reload_signal:
+            continue
+        try:
+            await reload_engine()
+        except Exception as e:
+            # The signal stays unrecorded, so the next poll retries
+            logger.error(f"Failed to reload recommendation engine: {e}")
+            continue
+        app.state.reload_signal = signal
+        logger.info("Recommendation engine reloaded after refresh signal")
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the recommendation engine on startup"""
+    # Signals written before this worker loaded its data are already reflected in it
+    app.state.reload_signal = _read_reload_signal()
     try:
+        await db_manager.connect()
         await recommendation_engine.initialize()
+        await refresh_popular_cache()
         logger.info("Recommendation engine initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize recommendation engine: {e}")
+    app.state.reload_watcher = (
+        asyncio.create_task(_reload_watcher()) if settings.reload_signal_file else None
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and release database connections on shutdown"""
+    if app.state.reload_watcher is not None:
+        app.state.reload_watcher.cancel()
+    await db_manager.close()
 
 @app.get("/", tags=["Health"])
 async def root():
@@ -67,20 +184,63 @@ async def health_check():
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Service unhealthy: {str(e)}")
 
+async def _similar_songs_payload(song_id: int, k: int, metric: str) -> dict:
+    """Build the similar-songs response body"""
+    similar_songs = await recommendation_engine.find_similar_songs(
+        song_id=song_id,
+        k=k,
+        metric=metric
+    )
+    return {
+        "song_id": song_id,
+        "similar_songs": dump_songs(similar_songs),
+        "algorithm": "collaborative_filtering_knn",
+        "metric": metric
+    }
+
 @app.post("/recommendations/similar-songs", response_model=SimilarSongsResponse, tags=["Recommendations"])
 async def get_similar_songs(request: SimilarSongsRequest):
     """Get similar songs using collaborative filtering (k-NN)"""
     try:
-        similar_songs = await recommendation_engine.find_similar_songs(
-            song_id=request.song_id,
-            k=request.k,
-            metric=request.metric.value
+        return ORJSONResponse(
+            await _similar_songs_payload(request.song_id, request.k, request.metric.value)
         )
-        return SimilarSongsResponse(
-            song_id=request.song_id,
-            similar_songs=similar_songs,
-            algorithm="collaborative_filtering_knn",
-            metric=request.metric.value
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak If-None-Match comparison (RFC 7232), since nginx gzip rewrites our ETags as weak"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+@app.get("/recommendations/similar-songs/{song_id}", response_model=SimilarSongsResponse, tags=["Recommendations"])
+async def get_similar_songs_cacheable(
+    request: Request,
+    song_id: int = Path(..., gt=0),
+    k: int = Query(10, ge=1, le=50),
+    metric: MetricType = MetricType.cosine
+):
+    """HTTP-cacheable variant of similar songs; results only change when the model is rebuilt"""
+    headers = {}
+    if recommendation_engine.is_initialized:
+        key = f"{recommendation_engine.model_version}:{song_id}:{k}:{metric.value}"
+        etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+        headers = {
+            "Cache-Control": f"public, max-age={settings.cache_ttl}, stale-while-revalidate=600",
+            "ETag": etag
+        }
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+    
+    try:
+        return ORJSONResponse(
+            await _similar_songs_payload(song_id, k, metric.value),
+            headers=headers
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -93,28 +253,36 @@ async def get_content_based_recommendations(request: ContentBasedRequest):
             title_string=request.song_title,
             n_recommendations=request.n_recommendations
         )
-        return ContentBasedResponse(
-            query_title=request.song_title,
-            matched_title=recommendations['matched_title'],
-            recommendations=recommendations['songs'],
-            algorithm="content_based_filtering"
-        )
+        return ORJSONResponse({
+            "query_title": request.song_title,
+            "matched_title": recommendations['matched_title'],
+            "recommendations": dump_songs(recommendations['songs']),
+            "algorithm": "content_based_filtering"
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/recommendations/popular", response_model=PopularSongsResponse, tags=["Recommendations"])
-async def get_popular_songs(limit: int = 10, algorithm: str = "bayesian"):
+async def get_popular_songs(
+    limit: int = Query(10, ge=1, le=settings.max_recommendations),
+    algorithm: str = "bayesian"
+):
     """Get popular songs using bayesian average or simple frequency"""
     try:
-        popular_songs = await recommendation_engine.get_popular_songs(
-            limit=limit,
-            algorithm=algorithm
-        )
-        return PopularSongsResponse(
-            popular_songs=popular_songs,
-            algorithm=algorithm,
-            limit=limit
-        )
+        # Any algorithm other than bayesian falls back to frequency, as in the engine
+        cached = app.state.popular_cache.get("bayesian" if algorithm == "bayesian" else "frequency")
+        if cached is not None:
+            popular_songs = cached[:limit]
+        else:
+            popular_songs = dump_songs(await recommendation_engine.get_popular_songs(
+                limit=limit,
+                algorithm=algorithm
+            ))
+        return ORJSONResponse({
+            "popular_songs": popular_songs,
+            "algorithm": algorithm,
+            "limit": limit
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -130,18 +298,36 @@ async def get_song_details(song_id: int):
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/songs/search/{query}", response_model=SearchResponse, tags=["Songs"])
-async def search_songs(query: str, limit: int = 10):
+async def search_songs(
+    query: str,
+    limit: int = Query(10, ge=1, le=settings.max_recommendations)
+):
     """Search songs by title"""
     try:
         results = await recommendation_engine.search_songs(query, limit)
-        return SearchResponse(
-            query=query,
-            results=results,
-            total_found=len(results)
-        )
+        return ORJSONResponse({
+            "query": query,
+            "results": dump_songs(results),
+            "total_found": len(results)
+        })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/users/{user_id}/history", tags=["Users"])
+async def get_user_play_history(user_id: str):
+    """Stream a user's play history as newline-delimited JSON, most played first"""
+    # Run the query before the 200 is sent, so database failures become a 503
+    try:
+        lines, release = await db_manager.open_user_play_history_stream(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Play history unavailable: {e}")
+    # The background task also returns the connection if the client goes away before streaming starts
+    return StreamingResponse(
+        lines,
+        media_type="application/x-ndjson",
+        background=BackgroundTask(release)
+    )
+
 @app.get("/stats", response_model=SystemStats, tags=["Statistics"])
 async def get_system_stats():
     """Get system statistics"""
@@ -151,10 +337,33 @@ async def get_system_stats():
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/admin/refresh", tags=["Admin"])
+async def refresh_data(x_api_key: Optional[str] = Header(None)):
+    """Drop cached data and reload the recommendation engine from the database"""
+    # Reloading is expensive, so it is never open to anonymous clients
+    if not settings.api_key:
+        raise HTTPException(status_code=403, detail="Admin API key not configured")
+    if x_api_key != settings.api_key:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    try:
+        await reload_engine()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    # Other worker processes pick this up within reload_poll_interval seconds
+    if settings.reload_signal_file:
+        try:
+            app.state.reload_signal = _write_reload_signal()
+        except Exception as e:
+            logger.error(f"Failed to signal the other workers to reload: {e}")
+    return {"status": "refreshed"}
+
 if __name__ == "__main__":
     uvicorn.run(
         "api.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        loop="uvloop",
+        http="httptools"
     )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
@@ -14,6 +14,8 @@ class PopularityAlgorithm(str, Enum):
 
 class SongInfo(BaseModel):
     """Song information model"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     song_id: int = Field(..., description="Unique song identifier")
     title: str = Field(..., description="Song title")
     genre: Optional[str] = Field(None, description="Song genre")
@@ -61,6 +63,8 @@ class UserPlayHistory(BaseModel):
 
 class SystemStats(BaseModel):
     """System statistics model"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
     total_songs: int = Field(..., description="Total number of songs")
     total_users: int = Field(..., description="Total number of users")
     total_plays: int = Field(..., description="Total number of plays")
@@ -1,42 +1,118 @@
 import numpy as np
 import pandas as pd
-from sklearn.neighbors import NearestNeighbors
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
-from scipy.sparse import csr_matrix
-from fuzzywuzzy import process
+from sklearn.preprocessing import OneHotEncoder, normalize
+from scipy.sparse import coo_matrix, issparse
+from scipy.sparse.linalg import svds
+from rapidfuzz import fuzz, process, utils
 from typing import List, Dict, Any, Optional, Tuple
 import logging
+import asyncio
+import hashlib
+import os
+import glob
+import tempfile
+import joblib
 from collections import Counter
 
-from .database import DatabaseManager
+from .database import DatabaseManager, LRUCache
 from .models import SongInfo
 
 logger = logging.getLogger(__name__)
 
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` largest scores, best first (ties broken by lower index)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(scores):
+        # argpartition keeps arbitrary members of a tie at the k-th score, so select
+        # everything above it and then the lowest-index songs tied with it
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        tied = np.flatnonzero(scores == kth)[:k - len(above)]
+        top = np.concatenate((above, tied))
+    else:
+        top = np.arange(len(scores))
+    return top[np.lexsort((top, -scores[top]))]
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise `_top_k_indices` for a 2-D block of scores, with `0 < k < scores.shape[1]`"""
+    # k-th largest score per row; keep everything above it plus the lowest-index ties
+    kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+    above = scores > kth
+    tied = scores == kth
+    need = k - above.sum(axis=1, keepdims=True)
+    selected = above | (tied & (np.cumsum(tied, axis=1) <= need))
+    # Exactly k per row, and nonzero walks each row in index order
+    top = np.nonzero(selected)[1].reshape(len(scores), k)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
+
 class RecommendationEngine:
-    """Main recommendation engine class"""
+    """Main recommendation engine class
+    
+    All model state is built by initialize(); request methods only read it, and the
+    NumPy arrays are marked read-only, so concurrent requests need no locking.
+    """
     
-    def __init__(self, db_manager: DatabaseManager):
+    # Largest k served by find_similar_songs (matches SimilarSongsRequest.k)
+    MAX_NEIGHBORS = 50
+    SIMILARITY_METRICS = ('cosine', 'euclidean')
+    # Below this user-item density ARPACK (cost ~ nnz * k) beats randomized SVD
+    SPARSE_SVD_DENSITY = 0.02
+    # Distinct (title, n) content-based results kept between initializations
+    RESULT_CACHE_SIZE = 1024
+    # Rows per block when precomputing the cosine table (bounds the block to rows x N floats)
+    TOPK_CHUNK_ROWS = 1024
+    # Bump when the persisted artifacts change shape or meaning
+    MODEL_CACHE_VERSION = 4
+    
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        model_cache_dir: Optional[str] = None,
+        svd_components: int = 20,
+        svd_iterations: int = 5
+    ):
         self.db_manager = db_manager
+        self.model_cache_dir = model_cache_dir
+        self.svd_components = svd_components
+        self.svd_iterations = svd_iterations
         self.is_initialized = False
+        self.model_version = None
         
         # Data structures
         self.song_frequency_df = None
         self.song_details_df = None
         self.user_item_matrix = None
         self.song_genres_matrix = None
-        self.cosine_sim_matrix = None
         self.svd_model = None
         self.reduced_matrix = None
+        self.item_vectors = None
+        self.item_sq_norms = None
+        self.cosine_topk_idx = None
+        self.cosine_topk_sim = None
         
         # Mappings
         self.user_mapper = {}
         self.song_mapper = {}
         self.user_inv_mapper = {}
         self.song_inv_mapper = {}
+        self._user_uniques = None
+        self._song_uniques = None
         self.song_titles = {}
-        self.song_idx = {}
+        self.song_details_by_id = {}
+        self.all_titles = []
+        
+        # Per-song and per-user play aggregates, computed once per initialization
+        self._play_song_ids = None
+        self._song_play_totals = None
+        self._song_bayesian_avg = None
+        self._user_play_totals = None
+        
+        # Results are pure functions of their arguments until the next initialize()
+        self._content_cache = LRUCache(self.RESULT_CACHE_SIZE, ttl=float('inf'))
         
         # Statistics
         self.system_stats = {}
@@ -45,21 +121,14 @@ class RecommendationEngine:
         """Initialize the recommendation engine with data from database"""
         try:
             logger.info("Initializing recommendation engine...")
+            # Never serve a mix of old and new state if this fails part-way
+            self.is_initialized = False
             
             # Load data from database
             await self._load_data()
             
-            # Create user-item matrix
-            self._create_user_item_matrix()
-            
-            # Prepare content-based filtering
-            self._prepare_content_based_filtering()
-            
-            # Initialize matrix factorization
-            self._initialize_matrix_factorization()
-            
-            # Calculate system statistics
-            self._calculate_system_stats()
+            # The model build is CPU-bound, so keep it off the event loop
+            await asyncio.to_thread(self._build_model)
             
             self.is_initialized = True
             logger.info("Recommendation engine initialized successfully")
@@ -68,64 +137,204 @@ class RecommendationEngine:
             logger.error(f"Failed to initialize recommendation engine: {e}")
             raise
     
+    def _build_model(self):
+        """Build every derived structure from the loaded dataframes"""
+        # Fingerprint of the loaded data, used to version cached responses and the model file
+        self.model_version = self._compute_model_version()
+        
+        # Reuse the matrix, SVD and neighbour tables from a previous start on the same data
+        if self._load_persisted_model():
+            self._set_item_vectors()
+        else:
+            # Create user-item matrix
+            self._create_user_item_matrix()
+            
+            # Initialize matrix factorization
+            self._initialize_matrix_factorization()
+            
+            # Precompute the neighbour tables over the song vectors
+            self._build_knn_index()
+            
+            self._persist_model()
+        
+        # Prepare content-based filtering
+        self._prepare_content_based_filtering()
+        
+        # Aggregate plays per song and per user (shared by popularity and stats)
+        self._compute_play_aggregates()
+        
+        # Calculate system statistics
+        self._calculate_system_stats()
+        
+        # Requests only read the model, so writing into it is a bug
+        self._freeze_arrays()
+        
+        # Cached results were computed from the previous data
+        self._content_cache.clear()
+    
     async def _load_data(self):
         """Load data from database"""
-        self.song_frequency_df = await self.db_manager.get_song_frequency_data()
-        self.song_details_df = await self.db_manager.get_song_details_data()
+        # The two loads are independent, so run them concurrently
+        self.song_frequency_df, self.song_details_df = await asyncio.gather(
+            self.db_manager.get_song_frequency_data(),
+            self.db_manager.get_song_details_data()
+        )
         
         logger.info(f"Loaded {len(self.song_frequency_df)} frequency records")
         logger.info(f"Loaded {len(self.song_details_df)} song details")
     
     def _create_user_item_matrix(self):
         """Create sparse user-item matrix"""
-        M = self.song_frequency_df['userid'].nunique()
-        N = self.song_frequency_df['songid'].nunique()
-
-        self.user_mapper = dict(zip(np.unique(self.song_frequency_df["userid"]), list(range(M))))
-        self.song_mapper = dict(zip(np.unique(self.song_frequency_df["songid"]), list(range(N))))
-        self.user_inv_mapper = dict(zip(list(range(M)), np.unique(self.song_frequency_df["userid"])))
-        self.song_inv_mapper = dict(zip(list(range(N)), np.unique(self.song_frequency_df["songid"])))
+        # One C-level pass per column gives integer codes plus the sorted unique ids
+        user_codes, user_uniques = pd.factorize(self.song_frequency_df['userid'], sort=True)
+        song_codes, song_uniques = pd.factorize(self.song_frequency_df['songid'], sort=True)
+        self._user_uniques = np.asarray(user_uniques)
+        self._song_uniques = np.asarray(song_uniques)
+        self._build_mappers()
 
-        user_index = [self.user_mapper[i] for i in self.song_frequency_df['userid']]
-        item_index = [self.song_mapper[i] for i in self.song_frequency_df['songid']]
-
-        self.user_item_matrix = csr_matrix(
-            (self.song_frequency_df["plays"], (user_index, item_index)), 
-            shape=(M, N)
-        )
+        # The factorize codes are already NumPy arrays, so they index the COO triplets directly
+        self.user_item_matrix = coo_matrix(
+            (self.song_frequency_df["plays"].to_numpy(), (user_codes, song_codes)),
+            shape=(len(self._user_uniques), len(self._song_uniques))
+        ).tocsr()
         
         logger.info(f"Created user-item matrix: {self.user_item_matrix.shape}")
     
+    def _build_mappers(self):
+        """Build the id <-> matrix index mappings from the sorted unique ids"""
+        M = len(self._user_uniques)
+        N = len(self._song_uniques)
+        self.user_mapper = dict(zip(self._user_uniques, range(M)))
+        self.song_mapper = dict(zip(self._song_uniques, range(N)))
+        self.user_inv_mapper = dict(zip(range(M), self._user_uniques))
+        self.song_inv_mapper = dict(zip(range(N), self._song_uniques))
+    
     def _prepare_content_based_filtering(self):
         """Prepare content-based filtering components"""
         # Create song titles mapping
         self.song_titles = dict(zip(self.song_details_df['songid'], self.song_details_df['title']))
-        self.song_idx = dict(zip(self.song_details_df['title'], list(self.song_details_df.index)))
+        self.all_titles = self.song_details_df['title'].tolist()
         
-        # Create genre matrix
-        song_details_copy = self.song_details_df.copy()
-        song_details_copy['genre'] = song_details_copy['genre'].apply(lambda x: [x])
+        # In-memory song details so recommendation results need no database lookups
+        details = self.song_details_df.set_index('songid')[['title', 'genre', 'artist']]
+        details = details.astype(object).where(details.notna(), None)
+        self.song_details_by_id = details.to_dict('index')
         
-        genres = set(g for G in song_details_copy['genre'] for g in G)
-        for g in genres:
-            song_details_copy[g] = song_details_copy.genre.transform(lambda x: int(g in x))
+        # Sparse one-hot genre matrix with L2-normalized rows, so a dot product is the cosine
+        encoder = OneHotEncoder(sparse_output=True, dtype=np.float32)
+        genres_matrix = encoder.fit_transform(self.song_details_df[['genre']])
+        self.song_genres_matrix = normalize(genres_matrix, norm='l2', axis=1).tocsr()
         
-        self.song_genres_matrix = song_details_copy.drop(columns=['songid', 'title', 'genre'])
-        self.cosine_sim_matrix = cosine_similarity(self.song_genres_matrix, self.song_genres_matrix)
-        
-        logger.info(f"Created genre similarity matrix: {self.cosine_sim_matrix.shape}")
+        logger.info(f"Created genre matrix: {self.song_genres_matrix.shape}")
+    
+    def _genre_similarity_row(self, idx: int) -> np.ndarray:
+        """Cosine similarity of song `idx` to every song, computed from the sparse genre matrix"""
+        # Rows are computed on demand: the full N x N product has sum(n_genre^2) non-zeros
+        return (self.song_genres_matrix @ self.song_genres_matrix[idx].T).toarray().ravel()
     
     def _initialize_matrix_factorization(self):
         """Initialize matrix factorization model"""
         try:
-            self.svd_model = TruncatedSVD(n_components=20, n_iter=10, random_state=42)
-            self.reduced_matrix = self.svd_model.fit_transform(self.user_item_matrix.T)
-            logger.info(f"Matrix factorization initialized: {self.reduced_matrix.shape}")
+            M, N = self.user_item_matrix.shape
+            density = self.user_item_matrix.nnz / (M * N)
+            
+            if density < self.SPARSE_SVD_DENSITY:
+                # ARPACK works on the sparse matrix directly; singular values come back ascending
+                U, S, _ = svds(
+                    self.user_item_matrix.T.astype(np.float32),
+                    k=self.svd_components,
+                    random_state=42
+                )
+                order = np.argsort(S)[::-1]
+                self.svd_model = None
+                reduced = U[:, order] * S[order]
+            else:
+                # Randomized SVD converges for a low-rank truncation in a few LU-normalized power iterations
+                self.svd_model = TruncatedSVD(
+                    n_components=self.svd_components,
+                    algorithm='randomized',
+                    n_iter=self.svd_iterations,
+                    n_oversamples=10,
+                    power_iteration_normalizer='LU',
+                    random_state=42
+                )
+                reduced = self.svd_model.fit_transform(self.user_item_matrix.T)
+            
+            # float32 row-major halves the bandwidth of every similarity product; low-rank factors need no more precision
+            self.reduced_matrix = np.ascontiguousarray(reduced, dtype=np.float32)
+            logger.info(
+                f"Matrix factorization initialized: {self.reduced_matrix.shape} "
+                f"({'arpack' if self.svd_model is None else 'randomized'}, density {density:.4f})"
+            )
         except Exception as e:
             logger.warning(f"Matrix factorization initialization failed: {e}")
             self.svd_model = None
             self.reduced_matrix = None
     
+    def _build_knn_index(self):
+        """Prepare the song vectors so requests only run one product plus a partial sort"""
+        self._set_item_vectors()
+        self._build_cosine_topk_table()
+        
+        # Squared row norms, so euclidean distances follow from one dot product per request
+        if issparse(self.item_vectors):
+            squares = self.item_vectors.multiply(self.item_vectors)
+        else:
+            squares = np.square(self.item_vectors)
+        self.item_sq_norms = np.asarray(squares.sum(axis=1), dtype=np.float64).ravel()
+        logger.info(f"Built k-NN index over {self.item_vectors.shape[0]} songs")
+    
+    def _set_item_vectors(self):
+        """One row per song: latent factors if available, otherwise the sparse play counts"""
+        # Every product over these accepts CSR input, so nothing is densified
+        if self.reduced_matrix is not None:
+            self.item_vectors = self.reduced_matrix
+        else:
+            # float32, so the products cannot overflow integer play counts
+            self.item_vectors = self.user_item_matrix.T.tocsr().astype(np.float32)
+    
+    def _build_cosine_topk_table(self):
+        """Precompute each song's MAX_NEIGHBORS most cosine-similar songs, best first"""
+        # Unit-length rows, so a block of dot products is a block of cosine similarities
+        unit_vectors = normalize(self.item_vectors, norm='l2', axis=1)
+        n_songs = unit_vectors.shape[0]
+        k = min(self.MAX_NEIGHBORS, n_songs - 1)
+        
+        self.cosine_topk_idx = np.empty((n_songs, max(k, 0)), dtype=np.int32)
+        self.cosine_topk_sim = np.empty((n_songs, max(k, 0)), dtype=np.float32)
+        if k <= 0:
+            return
+        
+        # Only a TOPK_CHUNK_ROWS x N block of the similarity matrix exists at any time
+        for start in range(0, n_songs, self.TOPK_CHUNK_ROWS):
+            stop = min(start + self.TOPK_CHUNK_ROWS, n_songs)
+            sims = unit_vectors[start:stop] @ unit_vectors.T
+            sims = np.asarray(sims.toarray() if issparse(sims) else sims, dtype=np.float32)
+            rows = np.arange(stop - start)
+            sims[rows, rows + start] = -np.inf  # Exclude each song itself
+            
+            # Best k per row, ties going to the lower index (the diagonal is -inf, so k < N works)
+            top = _top_k_rows(sims, k)
+            
+            self.cosine_topk_idx[start:stop] = top
+            self.cosine_topk_sim[start:stop] = np.take_along_axis(sims, top, axis=1)
+        
+        logger.info(f"Precomputed cosine top-{k} table: {self.cosine_topk_idx.shape}")
+    
+    def _compute_play_aggregates(self):
+        """Group the play data by song and by user once, deriving the popularity scores"""
+        song_stats = self.song_frequency_df.groupby('songid')['plays'].agg(['sum', 'count', 'mean'])
+        counts = song_stats['count'].to_numpy(dtype=np.float64)
+        means = song_stats['mean'].to_numpy(dtype=np.float64)
+        
+        C = counts.mean()  # Average number of plays
+        m = means.mean()   # Average rating
+        
+        self._play_song_ids = song_stats.index.to_numpy()
+        self._song_play_totals = song_stats['sum'].to_numpy(dtype=np.float64)
+        self._song_bayesian_avg = (C * m + counts * means) / (C + counts)
+        self._user_play_totals = self.song_frequency_df.groupby('userid', observed=True)['plays'].sum()
+    
     def _calculate_system_stats(self):
         """Calculate system statistics"""
         n_total = self.user_item_matrix.shape[0] * self.user_item_matrix.shape[1]
@@ -134,15 +343,100 @@ class RecommendationEngine:
         
         self.system_stats = {
             'total_songs': len(self.song_details_df),
-            'total_users': self.song_frequency_df['userid'].nunique(),
+            'total_users': len(self._user_play_totals),
             'total_plays': int(self.song_frequency_df['plays'].sum()),
             'total_genres': self.song_details_df['genre'].nunique(),
             'sparsity': round(sparsity, 4),
-            'avg_plays_per_user': round(self.song_frequency_df.groupby('userid')['plays'].sum().mean(), 2),
-            'avg_plays_per_song': round(self.song_frequency_df.groupby('songid')['plays'].sum().mean(), 2),
+            'avg_plays_per_user': round(self._user_play_totals.mean(), 2),
+            'avg_plays_per_song': round(self._song_play_totals.mean(), 2),
             'matrix_shape': self.user_item_matrix.shape
         }
     
+    def _freeze_arrays(self):
+        """Mark the model arrays read-only so an accidental in-place write raises"""
+        arrays = (
+            self.reduced_matrix, self.cosine_topk_idx, self.cosine_topk_sim, self.item_sq_norms,
+            self._user_uniques, self._song_uniques,
+            self._play_song_ids, self._song_play_totals, self._song_bayesian_avg,
+        )
+        for arr in arrays:
+            if isinstance(arr, np.ndarray):
+                arr.setflags(write=False)
+    
+    def _compute_model_version(self) -> str:
+        """Derive a version string from the loaded data so identical data gives the same version"""
+        # The factorization parameters are part of the version, since the persisted model depends on them
+        digest = hashlib.sha1(
+            f"{self.MODEL_CACHE_VERSION}:{self.svd_components}:{self.svd_iterations}".encode()
+        )
+        for df in (self.song_frequency_df, self.song_details_df):
+            digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return digest.hexdigest()[:16]
+    
+    def _model_cache_path(self) -> Optional[str]:
+        if not self.model_cache_dir:
+            return None
+        return os.path.join(self.model_cache_dir, f"model_{self.model_version}.joblib")
+    
+    def _load_persisted_model(self) -> bool:
+        """Load the matrix, SVD and neighbour tables saved for this data version, if present"""
+        path = self._model_cache_path()
+        if path is None or not os.path.exists(path):
+            return False
+        try:
+            # Numeric arrays are memory-mapped rather than read into memory
+            state = joblib.load(path, mmap_mode='r')
+            self._user_uniques = state['user_uniques']
+            self._song_uniques = state['song_uniques']
+            self.user_item_matrix = state['user_item_matrix']
+            self.svd_model = state['svd_model']
+            self.reduced_matrix = state['reduced_matrix']
+            self.cosine_topk_idx = state['cosine_topk_idx']
+            self.cosine_topk_sim = state['cosine_topk_sim']
+            self.item_sq_norms = state['item_sq_norms']
+        except Exception as e:
+            logger.warning(f"Failed to load persisted model {path}: {e}")
+            return False
+        
+        self._build_mappers()
+        logger.info(f"Loaded persisted model {path}: {self.user_item_matrix.shape}")
+        return True
+    
+    def _persist_model(self):
+        """Save the matrix, SVD and neighbour tables so a restart on the same data skips them"""
+        path = self._model_cache_path()
+        if path is None:
+            return
+        state = {
+            'user_uniques': self._user_uniques,
+            'song_uniques': self._song_uniques,
+            'user_item_matrix': self.user_item_matrix,
+            'svd_model': self.svd_model,
+            'reduced_matrix': self.reduced_matrix,
+            'cosine_topk_idx': self.cosine_topk_idx,
+            'cosine_topk_sim': self.cosine_topk_sim,
+            'item_sq_norms': self.item_sq_norms,
+        }
+        try:
+            os.makedirs(self.model_cache_dir, exist_ok=True)
+            # Write to a temp file and rename, so concurrent workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.model_cache_dir, suffix='.tmp')
+            os.close(fd)
+            try:
+                joblib.dump(state, tmp_path)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.remove(tmp_path)
+                raise
+            
+            # Models for older data versions are never loaded again
+            for stale in glob.glob(os.path.join(self.model_cache_dir, 'model_*.joblib')):
+                if stale != path:
+                    os.remove(stale)
+            logger.info(f"Persisted model to {path}")
+        except Exception as e:
+            logger.warning(f"Failed to persist model to {path}: {e}")
+    
     async def find_similar_songs(self, song_id: int, k: int = 10, metric: str = 'cosine') -> List[SongInfo]:
         """Find similar songs using collaborative filtering"""
         if not self.is_initialized:
@@ -151,38 +445,36 @@ class RecommendationEngine:
         if song_id not in self.song_mapper:
             raise ValueError(f"Song ID {song_id} not found")
         
+        if metric not in self.SIMILARITY_METRICS:
+            raise ValueError(f"Unsupported metric: {metric}")
+        
         try:
-            # Use matrix factorization if available, otherwise use original matrix
-            if self.reduced_matrix is not None:
-                X = self.reduced_matrix.T
-            else:
-                X = self.user_item_matrix.T.toarray()
-            
             song_ind = self.song_mapper[song_id]
-            song_vec = X[song_ind].reshape(1, -1)
             
-            kNN = NearestNeighbors(n_neighbors=k+1, algorithm="brute", metric=metric)
-            kNN.fit(X)
-            distances, indices = kNN.kneighbors(song_vec, return_distance=True)
+            if metric == 'cosine':
+                # Neighbours were ranked at initialization, so this is a table lookup
+                neighbor_ids = self._song_uniques[self.cosine_topk_idx[song_ind, :k]]
+                similarities = self.cosine_topk_sim[song_ind, :k]
+                return self._get_songs_info([
+                    (int(neighbor_id), float(similarity))
+                    for neighbor_id, similarity in zip(neighbor_ids, similarities)
+                ])
+            
+            # ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b
+            dots = self.item_vectors @ self.item_vectors[song_ind].T
+            dots = np.asarray(dots.toarray() if issparse(dots) else dots, dtype=np.float64).ravel()
+            sq_dists = self.item_sq_norms + self.item_sq_norms[song_ind] - 2 * dots
+            distances = np.sqrt(np.maximum(sq_dists, 0))
+            distances[song_ind] = np.inf  # Exclude the song itself
             
-            similar_songs = []
-            for i in range(1, k+1):  # Skip first result (itself)
-                if i < len(indices[0]):
-                    neighbor_idx = indices[0][i]
-                    neighbor_song_id = self.song_inv_mapper[neighbor_idx]
-                    distance = distances[0][i]
-                    
-                    # Convert distance to similarity score
-                    if metric == 'cosine':
-                        similarity = 1 - distance
-                    else:
-                        similarity = 1 / (1 + distance)
-                    
-                    song_info = await self._get_song_info(neighbor_song_id, similarity)
-                    if song_info:
-                        similar_songs.append(song_info)
+            top = _top_k_indices(-distances, min(k, len(distances) - 1))
             
-            return similar_songs
+            # Convert distance to similarity score
+            similarities = 1 / (1 + distances[top])
+            return self._get_songs_info([
+                (int(neighbor_id), float(similarity))
+                for neighbor_id, similarity in zip(self._song_uniques[top], similarities)
+            ])
             
         except Exception as e:
             logger.error(f"Error finding similar songs: {e}")
@@ -193,35 +485,46 @@ class RecommendationEngine:
         if not self.is_initialized:
             raise ValueError("Recommendation engine not initialized")
         
+        # The match only depends on the preprocessed title, so equivalent spellings share an entry
+        cache_key = (utils.default_process(title_string), n_recommendations)
+        cached = self._content_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Find closest matching title
-            all_titles = self.song_details_df['title'].tolist()
-            closest_match = process.extractOne(title_string, all_titles)
-            matched_title = closest_match[0]
-            
-            if matched_title not in self.song_idx:
-                raise ValueError(f"Song '{matched_title}' not found in index")
-            
-            idx = self.song_idx[matched_title]
-            sim_scores = list(enumerate(self.cosine_sim_matrix[idx]))
-            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-            sim_scores = sim_scores[1:(n_recommendations+1)]
+            # Find closest matching title (same scoring and preprocessing as fuzzywuzzy's extractOne)
+            closest_match = process.extractOne(
+                title_string,
+                self.all_titles,
+                scorer=fuzz.WRatio,
+                processor=utils.default_process
+            )
+            if closest_match is None:
+                raise ValueError(f"No song matching '{title_string}' found")
+            matched_title, _, idx = closest_match
+            sim_row = self._genre_similarity_row(idx)
+            sim_row[idx] = -np.inf  # never recommend the matched song itself
+            top = _top_k_indices(sim_row, min(n_recommendations, len(sim_row) - 1))
             
-            recommendations = []
-            for song_idx, similarity in sim_scores:
-                song_row = self.song_details_df.iloc[song_idx]
-                song_info = SongInfo(
-                    song_id=int(song_row['songid']),
-                    title=song_row['title'],
-                    genre=song_row['genre'],
+            top_rows = self.song_details_df.iloc[top]
+            recommendations = [
+                SongInfo.model_construct(
+                    song_id=int(song_id),
+                    title=title,
+                    genre=genre,
                     similarity_score=float(similarity)
                 )
-                recommendations.append(song_info)
+                for song_id, title, genre, similarity in zip(
+                    top_rows['songid'], top_rows['title'], top_rows['genre'], sim_row[top]
+                )
+            ]
             
-            return {
+            result = {
                 'matched_title': matched_title,
                 'songs': recommendations
             }
+            self._content_cache.set(cache_key, result)
+            return result
             
         except Exception as e:
             logger.error(f"Error getting content-based recommendations: {e}")
@@ -243,55 +546,34 @@ class RecommendationEngine:
     
     async def _get_bayesian_popular_songs(self, limit: int) -> List[SongInfo]:
         """Get popular songs using Bayesian average"""
-        song_stats = self.song_frequency_df.groupby('songid')['plays'].agg(['count', 'mean'])
-        
-        C = song_stats['count'].mean()  # Average number of plays
-        m = song_stats['mean'].mean()   # Average rating
-        
-        def bayesian_avg(row):
-            return (C * m + row['count'] * row['mean']) / (C + row['count'])
-        
-        song_stats['bayesian_avg'] = song_stats.apply(bayesian_avg, axis=1)
-        top_songs = song_stats.sort_values('bayesian_avg', ascending=False).head(limit)
-        
-        popular_songs = []
-        for song_id, stats in top_songs.iterrows():
-            song_info = await self._get_song_info(song_id, stats['bayesian_avg'])
-            if song_info:
-                popular_songs.append(song_info)
-        
-        return popular_songs
+        return self._top_songs_by_score(self._song_bayesian_avg, limit)
     
     async def _get_frequency_popular_songs(self, limit: int) -> List[SongInfo]:
         """Get popular songs by frequency"""
-        song_totals = self.song_frequency_df.groupby('songid')['plays'].sum().sort_values(ascending=False)
-        top_songs = song_totals.head(limit)
-        
-        popular_songs = []
-        for song_id, total_plays in top_songs.items():
-            song_info = await self._get_song_info(song_id, float(total_plays))
-            if song_info:
-                popular_songs.append(song_info)
-        
-        return popular_songs
+        return self._top_songs_by_score(self._song_play_totals, limit)
     
-    async def _get_song_info(self, song_id: int, similarity_score: float = None) -> Optional[SongInfo]:
-        """Get song information"""
-        try:
-            song_details = await self.db_manager.get_song_by_id(song_id)
-            if not song_details:
-                return None
-            
-            return SongInfo(
+    def _top_songs_by_score(self, scores: np.ndarray, limit: int) -> List[SongInfo]:
+        """SongInfo for the `limit` best-scoring songs of a per-song score array"""
+        top = _top_k_indices(scores, limit)
+        return self._get_songs_info(
+            [(int(song_id), float(score)) for song_id, score in zip(self._play_song_ids[top], scores[top])]
+        )
+    
+    def _get_songs_info(self, scored_songs: List[Tuple[int, float]]) -> List[SongInfo]:
+        """Build SongInfo objects for (song_id, score) pairs from the in-memory details, keeping order"""
+        # The details were typed once at load time, so skip per-object validation here
+        details = self.song_details_by_id
+        return [
+            SongInfo.model_construct(
                 song_id=song_id,
-                title=song_details['title'],
-                genre=song_details.get('genre'),
-                artist=song_details.get('artist'),
-                similarity_score=similarity_score
+                title=details[song_id]['title'],
+                genre=details[song_id]['genre'],
+                artist=details[song_id]['artist'],
+                similarity_score=score
             )
-        except Exception as e:
-            logger.error(f"Error getting song info for {song_id}: {e}")
-            return None
+            for song_id, score in scored_songs
+            if song_id in details
+        ]
     
     async def get_song_details(self, song_id: int) -> Optional[Dict[str, Any]]:
         """Get detailed song information"""
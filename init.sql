@@ -23,12 +23,17 @@ CREATE TABLE IF NOT EXISTS songs (
     duration INT, -- in seconds
     path VARCHAR(500) NOT NULL,
     available TINYINT(1) DEFAULT 1,
+    -- Single indexed flag for the "playable" predicate used by every API query
+    is_available TINYINT(1) GENERATED ALWAYS AS (path <> '' AND available = 1) STORED,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (genre) REFERENCES genres(id) ON DELETE SET NULL,
     INDEX idx_song_available (available),
+    INDEX idx_song_is_available (is_available),
     INDEX idx_song_genre (genre),
-    INDEX idx_song_title (title)
+    INDEX idx_song_title (title),
+    -- Word-prefix title search (MATCH ... AGAINST in BOOLEAN MODE)
+    FULLTEXT INDEX ft_song_title (title)
 );
 
 -- Create frequency table (user-song interactions)
@@ -69,7 +74,7 @@ CREATE OR REPLACE VIEW active_songs AS
 SELECT s.*, g.name as genre_name
 FROM songs s
 LEFT JOIN genres g ON s.genre = g.id
-WHERE s.path != '' AND s.available = 1;
+WHERE s.is_available = 1;
 
 -- Create a view for user statistics
 CREATE OR REPLACE VIEW user_stats AS
@@ -98,7 +103,7 @@ SELECT
 FROM songs s
 LEFT JOIN frequency f ON s.id = f.songid
 LEFT JOIN genres g ON s.genre = g.id
-WHERE s.path != '' AND s.available = 1
+WHERE s.is_available = 1
 GROUP BY s.id, s.title, s.artist, g.name;
 
 -- Create stored procedure for getting similar songs data
@@ -108,7 +113,7 @@ BEGIN
     SELECT f.userid, f.songid, f.plays 
     FROM frequency f 
     JOIN songs s ON s.id = f.songid  
-    WHERE s.path <> '' AND s.available = 1;
+    WHERE s.is_available = 1;
 END //
 DELIMITER ;
 
@@ -119,7 +124,7 @@ BEGIN
     SELECT s.id as songid, s.title, g.name as genre, s.artist, s.duration, s.path, s.created_at
     FROM songs s 
     JOIN genres g ON g.id = s.genre 
-    WHERE s.path <> '' AND s.available = 1;
+    WHERE s.is_available = 1;
 END //
 DELIMITER ;
 
@@ -0,0 +1,37 @@
+-- Bring a songs table created before the is_available column and title FULLTEXT index up to date
+-- Safe to re-run: each step is skipped when it has already been applied
+-- Usage: mysql -u <user> -p <database> < migrations/001_song_availability_and_title_search.sql
+
+DROP PROCEDURE IF EXISTS migrate_song_availability;
+
+DELIMITER //
+CREATE PROCEDURE migrate_song_availability()
+BEGIN
+    -- Single indexed flag for the "playable" predicate used by every API query
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND COLUMN_NAME = 'is_available'
+    ) THEN
+        ALTER TABLE songs ADD COLUMN is_available TINYINT(1)
+            GENERATED ALWAYS AS (path <> '' AND available = 1) STORED;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND INDEX_NAME = 'idx_song_is_available'
+    ) THEN
+        CREATE INDEX idx_song_is_available ON songs(is_available);
+    END IF;
+
+    -- Word-prefix title search (MATCH ... AGAINST in BOOLEAN MODE)
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'songs' AND INDEX_NAME = 'ft_song_title'
+    ) THEN
+        CREATE FULLTEXT INDEX ft_song_title ON songs(title);
+    END IF;
+END //
+DELIMITER ;
+
+CALL migrate_song_availability();
+DROP PROCEDURE migrate_song_availability;
@@ -2,16 +2,24 @@
 """
 Script to run the MW Music Recommender API
 """
+import os
 import uvicorn
 from api.config import get_settings
 
 if __name__ == "__main__":
     settings = get_settings()
     
+    # Reload mode only supports a single worker; each worker builds its own
+    # DB pool and recommendation engine when it imports api.main
+    workers = 1 if settings.debug else (settings.workers or os.cpu_count() or 1)
+    
     uvicorn.run(
         "api.main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
         log_level=settings.log_level.lower()
     )
\ No newline at end of file
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from api.recommendation_engine import _top_k_indices, _top_k_rows
+
+
+def _reference_top_k(scores, k):
+    """Full stable sort: highest score first, lower index first among ties"""
+    return np.lexsort((np.arange(len(scores)), -scores))[:max(min(k, len(scores)), 0)]
+
+
+def _tie_heavy_scores(rng, n):
+    # Few distinct values so most k-th positions fall inside a tie
+    scores = rng.integers(0, 4, size=n).astype(np.float64)
+    scores[rng.random(n) < 0.2] = -np.inf
+    return scores
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_top_k_indices_matches_stable_sort(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 60))
+    scores = _tie_heavy_scores(rng, n)
+    for k in (-1, 0, 1, n // 2, n - 1, n, n + 5):
+        np.testing.assert_array_equal(_top_k_indices(scores, k), _reference_top_k(scores, k))
+
+
+def test_top_k_indices_all_tied():
+    scores = np.zeros(10)
+    np.testing.assert_array_equal(_top_k_indices(scores, 3), [0, 1, 2])
+
+
+def test_top_k_indices_empty():
+    assert len(_top_k_indices(np.empty(0), 5)) == 0
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_top_k_rows_matches_per_row_selection(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 60))
+    block = np.stack([_tie_heavy_scores(rng, n) for _ in range(8)])
+    for k in {1, n // 2, n - 1} - {0}:
+        expected = np.stack([_top_k_indices(row, k) for row in block])
+        np.testing.assert_array_equal(_top_k_rows(block, k), expected)